@@ -0,0 +1,186 @@
+import sys
+
+class PersistentTokenMap:
+    # An immutable map from non-negative token ids to strings. It is a tree of
+    # 32-slot lists indexed by 5 bits of the id at a time, so set and delete copy
+    # only the lists on the path of one id: O(log32(max id)) regardless of the
+    # number of tokens. All other lists are shared with the previous version.
+    _bits = 5
+    _width = 1 << _bits
+    _mask = _width - 1
+    
+    def __init__(self, items=None):
+        self._root = None
+        # Number of levels below the root.
+        self._shift = 0
+        self._len = 0
+        if items != None:
+            for key, value in items.items():
+                self._assoc_in_place(key, value)
+    
+    def set(self, key, value):
+        self._check_key(key)
+        if value == None:
+            raise ValueError('The value cannot be None')
+        result = self._copy()
+        if result._root == None:
+            result._root = [None] * self._width
+            while key >> (result._shift + self._bits) != 0:
+                result._shift += self._bits
+        while key >> (result._shift + self._bits) != 0:
+            result._grow()
+        node = result._root = list(result._root)
+        shift = result._shift
+        while shift > 0:
+            index = (key >> shift) & self._mask
+            child = node[index]
+            child = [None] * self._width if child == None else list(child)
+            node[index] = child
+            node = child
+            shift -= self._bits
+        index = key & self._mask
+        if node[index] == None:
+            result._len += 1
+        node[index] = value
+        return result
+    
+    def delete(self, key):
+        if key not in self:
+            raise KeyError(key)
+        result = self._copy()
+        node = result._root = list(result._root)
+        shift = result._shift
+        while shift > 0:
+            index = (key >> shift) & self._mask
+            node[index] = list(node[index])
+            node = node[index]
+            shift -= self._bits
+        node[key & self._mask] = None
+        result._len -= 1
+        return result
+    
+    def get(self, key, default=None):
+        if not isinstance(key, int) or key < 0 or key >> (self._shift + self._bits) != 0:
+            return default
+        node = self._root
+        shift = self._shift
+        while node != None and shift > 0:
+            node = node[(key >> shift) & self._mask]
+            shift -= self._bits
+        if node == None or node[key & self._mask] == None:
+            return default
+        return node[key & self._mask]
+    
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value == None:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key):
+        return self.get(key) != None
+    
+    def __len__(self):
+        return self._len
+    
+    def __iter__(self):
+        return (key for key, _ in self.items())
+    
+    def items(self):
+        if self._root == None:
+            return
+        stack = [(self._root, self._shift, 0)]
+        while len(stack) != 0:
+            (node, shift, prefix) = stack.pop()
+            for index in range(self._width - 1, -1, -1):
+                child = node[index]
+                if child == None:
+                    continue
+                key = prefix | (index << shift)
+                if shift == 0:
+                    yield (key, child)
+                else:
+                    stack.append((child, shift - self._bits, key))
+    
+    def values(self):
+        return (value for _, value in self.items())
+    
+    def estimate_bytes(self):
+        # Size of the map and all of its lists. The values are not counted.
+        size = sys.getsizeof(self)
+        stack = [(self._root, self._shift)] if self._root != None else []
+        while len(stack) != 0:
+            (node, shift) = stack.pop()
+            size += sys.getsizeof(node)
+            if shift > 0:
+                stack.extend((child, shift - self._bits) for child in node if child != None)
+        return size
+    
+    def bytes_delta(self, previous, key):
+        # The change of estimate_bytes between previous and this map, when this map
+        # was derived from previous by one set or delete of key.
+        size = self._path_bytes(key) - previous._path_bytes(key)
+        # Levels added above the previous root which are not on the path of the key.
+        node = self._root
+        shift = self._shift
+        while previous._root != None and shift > previous._shift:
+            if key >> (shift + self._bits) != 0:
+                size += sys.getsizeof(node)
+            node = node[0]
+            shift -= self._bits
+        return size
+    
+    def _path_bytes(self, key):
+        # Size of the lists on the path of the key, which set/delete replace.
+        size = 0
+        if self._root == None or key >> (self._shift + self._bits) != 0:
+            return size
+        node = self._root
+        shift = self._shift
+        while node != None:
+            size += sys.getsizeof(node)
+            if shift == 0:
+                break
+            node = node[(key >> shift) & self._mask]
+            shift -= self._bits
+        return size
+    
+    def _copy(self):
+        result = PersistentTokenMap()
+        result._root = self._root
+        result._shift = self._shift
+        result._len = self._len
+        return result
+    
+    def _grow(self):
+        root = [None] * self._width
+        root[0] = self._root
+        self._root = root
+        self._shift += self._bits
+    
+    def _assoc_in_place(self, key, value):
+        # Used while building, when no version has been shared yet.
+        self._check_key(key)
+        if value == None:
+            raise ValueError('The value cannot be None')
+        if self._root == None:
+            self._root = [None] * self._width
+            while key >> (self._shift + self._bits) != 0:
+                self._shift += self._bits
+        while key >> (self._shift + self._bits) != 0:
+            self._grow()
+        node = self._root
+        shift = self._shift
+        while shift > 0:
+            index = (key >> shift) & self._mask
+            if node[index] == None:
+                node[index] = [None] * self._width
+            node = node[index]
+            shift -= self._bits
+        if node[key & self._mask] == None:
+            self._len += 1
+        node[key & self._mask] = value
+    
+    def _check_key(self, key):
+        if not isinstance(key, int) or key < 0:
+            raise KeyError(f'Token ids must be non-negative integers: {key}')
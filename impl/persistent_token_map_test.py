@@ -0,0 +1,70 @@
+import unittest
+import random
+
+from persistent_token_map import PersistentTokenMap
+
+class TestPersistentTokenMap(unittest.TestCase):
+    
+    def test_init_from_dict(self):
+        items = {0: 'a', 1: 'b', 31: 'c', 32: 'd', 1025: 'e', 40000: 'f'}
+        token_map = PersistentTokenMap(items)
+        
+        self.assertEqual(len(token_map), len(items))
+        self.assertEqual(dict(token_map.items()), items)
+        for key, value in items.items():
+            self.assertIn(key, token_map)
+            self.assertEqual(token_map[key], value)
+        self.assertNotIn(2, token_map)
+        self.assertNotIn(10 ** 9, token_map)
+        with self.assertRaises(KeyError):
+            token_map[2]
+            
+    def test_set_and_delete_keep_previous_versions(self):
+        first = PersistentTokenMap({0: 'a', 1: 'b'})
+        
+        second = first.set(5000, 'c')
+        third = second.delete(0)
+        
+        self.assertEqual(dict(first.items()), {0: 'a', 1: 'b'})
+        self.assertEqual(dict(second.items()), {0: 'a', 1: 'b', 5000: 'c'})
+        self.assertEqual(dict(third.items()), {1: 'b', 5000: 'c'})
+        with self.assertRaises(KeyError):
+            third.delete(0)
+            
+    def test_bytes_delta_when_growing_several_levels(self):
+        first = PersistentTokenMap({0: 'a'})
+        
+        second = first.set(10 ** 6, 'b')
+        
+        self.assertEqual(second.estimate_bytes() - first.estimate_bytes(), second.bytes_delta(first, 10 ** 6))
+        self.assertEqual(dict(second.items()), {0: 'a', 10 ** 6: 'b'})
+            
+    def test_invalid_keys(self):
+        token_map = PersistentTokenMap()
+        with self.assertRaises(KeyError):
+            token_map.set(-1, 'a')
+        with self.assertRaises(KeyError):
+            token_map.set('a', 'a')
+        with self.assertRaises(ValueError):
+            token_map.set(1, None)
+            
+    def test_random_operations(self):
+        random.seed(0)
+        expected = {}
+        token_map = PersistentTokenMap()
+        for _ in range(500):
+            key = random.choice([random.randrange(64), random.randrange(100000)])
+            previous = token_map
+            if key in expected and random.random() < 0.5:
+                del expected[key]
+                token_map = token_map.delete(key)
+            else:
+                expected[key] = str(key)
+                token_map = token_map.set(key, str(key))
+            self.assertEqual(token_map.estimate_bytes() - previous.estimate_bytes(),
+                             token_map.bytes_delta(previous, key))
+        self.assertEqual(dict(token_map.items()), expected)
+        self.assertEqual(len(token_map), len(expected))
+                
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import random
+import timeit
+
+from to_tokens_converter import ToTokensConverter
+from tokenizer import Tokenizer
+
+def baseline_to_tokens(string, token_roots, chars_map, unk_token):
+    # The matching loop of to_tokens before offsets were added, used as a reference.
+    tokens = []
+    char_index = 0
+    while char_index < len(string):
+        if string[char_index] not in chars_map:
+            tokens.append(unk_token)
+            char_index += 1
+            continue
+        current_nodes = token_roots
+        last_node_with_token = None
+        last_index_with_token = char_index
+        while char_index < len(string):
+           if  string[char_index] in current_nodes:
+               node = current_nodes[string[char_index]]
+               if node.token != None:
+                   last_node_with_token = node
+                   last_index_with_token = char_index
+               current_nodes = node.children
+               char_index += 1
+           else:
+               break
+        tokens.append(last_node_with_token.token)
+        char_index = last_index_with_token + 1
+    return tokens
+
+random.seed(0)
+alphabet = 'abcdefgh '
+strings = [''.join(random.choice(alphabet) for _ in range(1000)) for _ in range(200)]
+
+tokenizer = Tokenizer(10)
+tokens_map = tokenizer.train(strings)
+chars_map = tokenizer._chars_map
+converter = ToTokensConverter(tokens_map, chars_map)
+token_roots = converter._state.token_roots
+unk_token = chars_map['unknown']
+assert [baseline_to_tokens(string, token_roots, chars_map, unk_token) for string in strings] == converter.to_tokens(strings)
+
+repeats = 10
+baseline_time = min(timeit.repeat(
+    lambda: [baseline_to_tokens(string, token_roots, chars_map, unk_token) for string in strings],
+    number=1, repeat=repeats))
+plain_time = min(timeit.repeat(lambda: converter.to_tokens(strings), number=1, repeat=repeats))
+offsets_time = min(timeit.repeat(lambda: converter.to_tokens_with_offsets(strings), number=1, repeat=repeats))
+print(f'baseline to_tokens:     {baseline_time:.4f}s')
+print(f'to_tokens:              {plain_time:.4f}s')
+print(f'to_tokens_with_offsets: {offsets_time:.4f}s')
+print(f'plain path overhead:    {(plain_time / baseline_time - 1) * 100:.1f}%')
+print(f'offsets overhead:       {(offsets_time / plain_time - 1) * 100:.1f}%')
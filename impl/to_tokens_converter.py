@@ -1,29 +1,203 @@
+from array import array
+import copy
+import sys
+import threading
+
+from persistent_token_map import PersistentTokenMap
+
 class TokenNode:
-    def __init__(self, basic_char: str, token: int, parent, children):
-        self.parent = parent
+    def __init__(self, basic_char: str, token: int, children):
         self.basic_char = basic_char
         self.token = token
         self.children = children
 
+class TokenTreeState:
+    # One published version of the vocabulary. It is never modified after it is
+    # published, so the token tree and the token map always agree.
+    def __init__(self, token_roots, token_map):
+        self.token_roots = token_roots
+        self.token_map = token_map
+
+class TokenUpdate:
+    # Describes what one add_token/remove_token changed, so that callers can keep
+    # their accounting up to date without walking the tree.
+    def __init__(self, token, added_string, removed_string, bytes_delta, token_map):
+        self.token = token
+        self.added_string = added_string
+        self.removed_string = removed_string
+        # The change of estimate_bytes caused by the update.
+        self.bytes_delta = bytes_delta
+        # The token map of the version the update published.
+        self.token_map = token_map
+
 class ToTokensConverter:
-    def __init__(self, token_map: dict, chars_map: dict):
-        self._token_map = token_map
+    def __init__(self, token_map: dict, chars_map: dict, on_update=None):
         self._chars_map = chars_map
+        # Called with the converter and a TokenUpdate after add_token/remove_token
+        # published a new version. It runs under the write lock, so updates are
+        # reported in the order they were published.
+        self._on_update = on_update
         self._unk_key = 'unknown'
-        self._init_token_tree()
+        # Serializes add_token/remove_token. Encoding does not take the lock.
+        self._write_lock = threading.Lock()
+        self._read_only = False
+        self._init_token_tree(PersistentTokenMap(token_map))
+        
+    def token_map(self):
+        # The token map of the current version. It must not be modified.
+        return self._state.token_map
+    
+    def estimate_bytes(self):
+        # Approximate size of the token tree and the maps of the current version.
+        # The token strings themselves are not counted.
+        state = self._state
+        size = state.token_map.estimate_bytes() + sys.getsizeof(self._chars_map)
+        size += sys.getsizeof(state.token_roots)
+        nodes = [state.token_roots]
+        while len(nodes) != 0:
+            children = nodes.pop()
+            for node in children.values():
+                size += self._node_bytes(node)
+                nodes.append(node.children)
+        return size
+    
+    def from_tokens(self, tokens):
+        token_map = self._state.token_map
+        return [''.join(token_map[token] for token in token_str) for token_str in tokens]
         
     def to_tokens(self, strings):
-        return [self._to_tokens(string) for string in strings]
+        # The state is never modified in place, so capturing it once gives
+        # the whole call a consistent view even if tokens are added meanwhile.
+        token_roots = self._state.token_roots
+        return [self._to_tokens(string, token_roots) for string in strings]
+    
+    def to_tokens_with_offsets(self, strings):
+        # For every string returns (tokens, starts, ends), where starts and ends
+        # are packed int32 arrays with the character span [start, end) of each token.
+        token_roots = self._state.token_roots
+        result = []
+        for string in strings:
+            starts = array('i')
+            ends = array('i')
+            tokens = self._to_tokens(string, token_roots, starts, ends)
+            result.append((tokens, starts, ends))
+        return result
+    
+    def add_token(self, token, string):
+        if len(string) == 0:
+            raise ValueError('The token string is empty')
+        for char in string:
+            if char not in self._chars_map:
+                raise KeyError(f'Unknown character: {char}')
+        self._check_writable()
+        # Identical strings are shared with other vocabularies loaded in the process.
+        string = sys.intern(string)
+        with self._write_lock:
+            state = self._state
+            if token in state.token_map:
+                raise KeyError('The token is already taken')
+            (token_roots, path) = self._copy_path(state.token_roots, string)
+            if path[-1].token != None:
+                raise KeyError('The string is already taken')
+            path[-1].token = token
+            token_map = state.token_map.set(token, string)
+            # Publishing the new state is a single assignment, so readers see either
+            # the old or the new version.
+            self._state = TokenTreeState(token_roots, token_map)
+            self._report_update(state, token, string, None)
+        
+    def remove_token(self, token):
+        self._check_writable()
+        with self._write_lock:
+            state = self._state
+            string = state.token_map[token]
+            if token == self._chars_map[self._unk_key]:
+                raise KeyError('The unknown token cannot be removed')
+            if string in self._chars_map and self._chars_map[string] == token:
+                raise KeyError('Basic character tokens cannot be removed')
+            (token_roots, path) = self._copy_path(state.token_roots, string)
+            path[-1].token = None
+            # Prune the nodes which no longer lead to any token.
+            for i in range(len(path) - 1, -1, -1):
+                node = path[i]
+                if node.token != None or len(node.children) != 0:
+                    break
+                siblings = path[i - 1].children if i > 0 else token_roots
+                del siblings[node.basic_char]
+            token_map = state.token_map.delete(token)
+            self._state = TokenTreeState(token_roots, token_map)
+            self._report_update(state, token, None, string)
+        
+    def snapshot(self):
+        # A read-only converter pinned to the current version, which is not affected
+        # by later add_token/remove_token calls on this converter.
+        snapshot = copy.copy(self)
+        snapshot._read_only = True
+        snapshot._on_update = None
+        snapshot._write_lock = None
+        return snapshot
+    
+    def _report_update(self, previous_state, token, added_string, removed_string):
+        if self._on_update == None:
+            return
+        state = self._state
+        string = added_string if added_string != None else removed_string
+        bytes_delta = self._path_bytes(state.token_roots, string) - self._path_bytes(previous_state.token_roots, string)
+        bytes_delta += state.token_map.bytes_delta(previous_state.token_map, token)
+        self._on_update(self, TokenUpdate(token, added_string, removed_string, bytes_delta, state.token_map))
+    
+    def _path_bytes(self, token_roots, string):
+        # Size of the roots and the nodes on the path of the string, which an update
+        # of the string replaces.
+        size = sys.getsizeof(token_roots)
+        current_nodes = token_roots
+        for char in string:
+            if char not in current_nodes:
+                break
+            node = current_nodes[char]
+            size += self._node_bytes(node)
+            current_nodes = node.children
+        return size
+    
+    def _node_bytes(self, node):
+        return sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.children)
+    
+    def _check_writable(self):
+        if self._read_only:
+            raise RuntimeError('Snapshots are read-only')
+    
+    def _copy_path(self, token_roots, string):
+        # Copy-on-write: only the roots and the nodes on the path of the string are
+        # copied, the rest of the tree is shared with the previous version. An update
+        # costs O(len(string) * fan-out), where the fan-out is at most the number of
+        # basic characters, plus O(log32(token)) for the token map.
+        token_roots = dict(token_roots)
+        current_nodes = token_roots
+        path = []
+        for char in string:
+            if char in current_nodes:
+                old_node = current_nodes[char]
+                last_node = TokenNode(char, old_node.token, dict(old_node.children))
+            else:
+                last_node = TokenNode(char, None, {})
+            current_nodes[char] = last_node
+            path.append(last_node)
+            current_nodes = last_node.children
+        return (token_roots, path)
     
-    def _to_tokens(self, string):
+    def _to_tokens(self, string, token_roots, starts=None, ends=None):
         tokens = []
         char_index = 0
         while char_index < len(string):
             if string[char_index] not in self._chars_map:
                 tokens.append(self._chars_map[self._unk_key])
+                if starts is not None:
+                    starts.append(char_index)
+                    ends.append(char_index + 1)
                 char_index += 1
                 continue
-            current_nodes = self._token_roots
+            start_index = char_index
+            current_nodes = token_roots
             last_node_with_token = None
             last_index_with_token = char_index
             while char_index < len(string):
@@ -38,21 +212,25 @@ class ToTokensConverter:
                    break
             tokens.append(last_node_with_token.token)
             char_index = last_index_with_token + 1
+            if starts is not None:
+                starts.append(start_index)
+                ends.append(char_index)
         return tokens
     
-    def _init_token_tree(self):
-        self._token_roots = {}
-        for token in self._token_map:
-            string = self._token_map[token]
-            current_nodes = self._token_roots
+    def _init_token_tree(self, token_map):
+        token_roots = {}
+        for token in token_map:
+            string = token_map[token]
+            current_nodes = token_roots
             last_node = None
             for char in string:
                 if char in current_nodes:
                     last_node = current_nodes[char]
                 else:
-                    last_node = TokenNode(char, None, last_node, {})
+                    last_node = TokenNode(char, None, {})
                     current_nodes[char] = last_node
                 current_nodes = last_node.children
             if last_node.token != None:
                 raise KeyError('The token is already taken')
-            last_node.token = token
\ No newline at end of file
+            last_node.token = token
+        self._state = TokenTreeState(token_roots, token_map)
\ No newline at end of file
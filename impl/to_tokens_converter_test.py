@@ -0,0 +1,89 @@
+import threading
+import unittest
+
+from to_tokens_converter import ToTokensConverter
+
+class TestToTokensConverter(unittest.TestCase):
+    
+    def setUp(self):
+        self.chars_map = {'a': 0, 'b': 1, 'c': 2, 'unknown': 3}
+        self.token_map = {0: 'a', 1: 'b', 2: 'c', 3: '□', 4: 'ab'}
+        self.converter = ToTokensConverter(self.token_map, self.chars_map)
+        
+    def test_add_token(self):
+        self.converter.add_token(5, 'abc')
+        
+        self.assertEqual(self.converter.to_tokens(['abcab']), [[5, 4]])
+        self.assertEqual(self.converter.token_map()[5], 'abc')
+        # The caller's map is not modified.
+        self.assertNotIn(5, self.token_map)
+        
+    def test_add_token_already_taken(self):
+        with self.assertRaises(KeyError):
+            self.converter.add_token(4, 'bc')
+        with self.assertRaises(KeyError):
+            self.converter.add_token(5, 'ab')
+        with self.assertRaises(KeyError):
+            self.converter.add_token(5, 'ad')
+        self.assertNotIn(5, self.converter.token_map())
+        self.assertEqual(self.converter.to_tokens(['abc']), [[4, 2]])
+            
+    def test_remove_token(self):
+        self.converter.add_token(5, 'abc')
+        self.converter.remove_token(4)
+        
+        self.assertEqual(self.converter.to_tokens(['abcab']), [[5, 0, 1]])
+        self.assertNotIn(4, self.converter.token_map())
+        
+        self.converter.remove_token(5)
+        self.assertEqual(self.converter.to_tokens(['abc']), [[0, 1, 2]])
+        # Nodes which no longer lead to any token are pruned.
+        self.assertEqual(self.converter._state.token_roots['a'].children, {})
+        
+    def test_remove_basic_char_token(self):
+        with self.assertRaises(KeyError):
+            self.converter.remove_token(0)
+        self.assertEqual(self.converter.to_tokens(['a']), [[0]])
+        
+    def test_remove_unknown_token(self):
+        with self.assertRaises(KeyError):
+            self.converter.remove_token(self.chars_map['unknown'])
+        self.assertEqual(self.converter.to_tokens(['aZ']), [[0, 3]])
+        self.assertEqual(self.converter.token_map()[3], '□')
+        
+    def test_snapshot_is_not_affected_by_updates(self):
+        snapshot = self.converter.snapshot()
+        
+        self.converter.add_token(5, 'abc')
+        self.converter.remove_token(4)
+        
+        tokens = snapshot.to_tokens(['abc'])
+        self.assertEqual(tokens, [[4, 2]])
+        self.assertEqual([snapshot.token_map()[token] for token in tokens[0]], ['ab', 'c'])
+        self.assertEqual(self.converter.to_tokens(['abc']), [[5]])
+        
+    def test_snapshot_is_read_only(self):
+        snapshot = self.converter.snapshot()
+        
+        with self.assertRaises(RuntimeError):
+            snapshot.add_token(5, 'abc')
+        with self.assertRaises(RuntimeError):
+            snapshot.remove_token(4)
+        self.assertEqual(snapshot.to_tokens(['abc']), [[4, 2]])
+        self.assertNotIn(5, self.converter.token_map())
+        
+    def test_concurrent_updates_are_not_lost(self):
+        strings = ['ba', 'bb', 'bc', 'ca', 'cb', 'cc', 'aa', 'ac', 'abc', 'bca', 'cab', 'aab']
+        threads = [threading.Thread(target=self.converter.add_token, args=(5 + i, string))
+                   for i, string in enumerate(strings)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        for i, string in enumerate(strings):
+            self.assertEqual(self.converter.to_tokens([string]), [[5 + i]])
+            self.assertEqual(self.converter.token_map()[5 + i], string)
+                
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,10 @@ class Tokenizer:
         toTokensConverter = ToTokensConverter(self._tokens_map, self._chars_map)
         return toTokensConverter.to_tokens(strings)
     
+    def to_tokens_with_offsets(self, strings):
+        toTokensConverter = ToTokensConverter(self._tokens_map, self._chars_map)
+        return toTokensConverter.to_tokens_with_offsets(strings)
+    
     def from_tokens(self, tokens):
         return [''.join(self._tokens_map[token] for token in token_str) for token_str in tokens]
         
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+import copy
+import sys
+import threading
+
+from to_tokens_converter import ToTokensConverter
+
+class RegistryStats:
+    def __init__(self):
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.resident_bytes = 0
+
+class RegistryEntry:
+    def __init__(self, converter, token_map, structure_bytes):
+        self.converter = converter
+        # The token map version and the size the registry currently accounts for.
+        self.token_map = token_map
+        self.structure_bytes = structure_bytes
+
+class TokenizerRegistry:
+    # Keeps compiled converters for many vocabularies in an LRU bounded by
+    # max_resident_bytes. The loader maps a vocabulary id to (tokens_map, chars_map),
+    # the same maps a trained Tokenizer holds.
+    #
+    # add_token/remove_token on a converter returned by the registry are recorded as
+    # overrides of the loaded vocabulary and applied again when it is reloaded after
+    # an eviction. Overrides are kept outside the LRU budget.
+    def __init__(self, loader, max_resident_bytes):
+        self._loader = loader
+        self._max_resident_bytes = max_resident_bytes
+        self._entries = OrderedDict()
+        self._stats = RegistryStats()
+        # Reference counts of the token strings of all resident vocabularies.
+        # Each distinct string is counted in resident_bytes once.
+        self._string_refs = {}
+        # Vocabulary id -> {token: string, or None if removed}.
+        self._overrides = {}
+        # Vocabulary id -> number of the latest load, to ignore updates of stale converters.
+        self._generations = {}
+        # Vocabulary id -> Event set when its in-flight load finishes.
+        self._loading = {}
+        self._lock = threading.Lock()
+    
+    def to_tokens(self, vocabulary_id, strings):
+        return self.get_converter(vocabulary_id).to_tokens(strings)
+    
+    def snapshot(self, vocabulary_id):
+        # A read-only converter pinned to the current version of the vocabulary.
+        # Use it to decode tokens it produced, since the vocabulary may change or be
+        # evicted between calls to the registry.
+        return self.get_converter(vocabulary_id).snapshot()
+    
+    def get_converter(self, vocabulary_id):
+        while True:
+            with self._lock:
+                if vocabulary_id in self._entries:
+                    self._entries.move_to_end(vocabulary_id)
+                    self._stats.hits += 1
+                    return self._entries[vocabulary_id].converter
+                loading = self._loading.get(vocabulary_id)
+                if loading == None:
+                    loading = threading.Event()
+                    self._loading[vocabulary_id] = loading
+                    generation = self._generations.get(vocabulary_id, 0) + 1
+                    self._generations[vocabulary_id] = generation
+                    overrides = dict(self._overrides.get(vocabulary_id, {}))
+                    break
+            # Another thread is loading this vocabulary.
+            loading.wait()
+        # The loader and the tree build run without the lock, so other
+        # vocabularies are served meanwhile.
+        try:
+            entry = self._load(vocabulary_id, generation, overrides)
+            with self._lock:
+                self._entries[vocabulary_id] = entry
+                self._retain(entry.token_map.values())
+                self._stats.resident_bytes += entry.structure_bytes
+                self._stats.loads += 1
+                self._evict()
+        finally:
+            with self._lock:
+                del self._loading[vocabulary_id]
+            loading.set()
+        return entry.converter
+    
+    def stats(self):
+        with self._lock:
+            return copy.copy(self._stats)
+    
+    def _load(self, vocabulary_id, generation, overrides):
+        (tokens_map, chars_map) = self._loader(vocabulary_id)
+        tokens_map = dict(tokens_map)
+        for token, string in overrides.items():
+            if string == None:
+                tokens_map.pop(token, None)
+            else:
+                tokens_map[token] = string
+        # Interning deduplicates identical token strings across vocabularies.
+        # Interned strings are released once no vocabulary references them.
+        tokens_map = {token: sys.intern(string) for token, string in tokens_map.items()}
+        chars_map = {sys.intern(char): token for char, token in chars_map.items()}
+        converter = ToTokensConverter(
+            tokens_map,
+            chars_map,
+            lambda updated, update: self._on_converter_update(vocabulary_id, generation, update))
+        return RegistryEntry(converter, converter.token_map(), converter.estimate_bytes())
+    
+    def _on_converter_update(self, vocabulary_id, generation, update):
+        # Costs O(1) apart from eviction: the converter reports what the update changed.
+        with self._lock:
+            # Converters replaced by a newer load of the vocabulary are ignored.
+            if self._generations[vocabulary_id] != generation:
+                return
+            self._overrides.setdefault(vocabulary_id, {})[update.token] = update.added_string
+            entry = self._entries.get(vocabulary_id)
+            if entry == None:
+                return
+            if update.added_string != None:
+                self._retain([update.added_string])
+            if update.removed_string != None:
+                self._release([update.removed_string])
+            entry.structure_bytes += update.bytes_delta
+            self._stats.resident_bytes += update.bytes_delta
+            entry.token_map = update.token_map
+            self._evict()
+    
+    def _retain(self, strings):
+        for string in strings:
+            if string in self._string_refs:
+                self._string_refs[string] += 1
+            else:
+                self._string_refs[string] = 1
+                self._stats.resident_bytes += sys.getsizeof(string)
+    
+    def _release(self, strings):
+        for string in strings:
+            self._string_refs[string] -= 1
+            if self._string_refs[string] == 0:
+                del self._string_refs[string]
+                self._stats.resident_bytes -= sys.getsizeof(string)
+    
+    def _evict(self):
+        # The most recently used vocabulary is kept even if it alone exceeds the limit.
+        while self._stats.resident_bytes > self._max_resident_bytes and len(self._entries) > 1:
+            (_, entry) = self._entries.popitem(last=False)
+            self._release(entry.token_map.values())
+            self._stats.resident_bytes -= entry.structure_bytes
+            self._stats.evictions += 1
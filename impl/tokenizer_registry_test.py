@@ -0,0 +1,233 @@
+import sys
+import threading
+import unittest
+
+from tokenizer import Tokenizer
+from tokenizer_registry import TokenizerRegistry
+
+class TestTokenizerRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        self.train_inputs = {
+            'first': ['aaabdaaabac', 'abdbdbdaaabb'],
+            'second': ['ccbdaaadabb', 'bbdbdbaacd'],
+            'third': ['ab']
+        }
+        self.loaded_ids = []
+        
+    def _loader(self, vocabulary_id):
+        self.loaded_ids.append(vocabulary_id)
+        tokenizer = Tokenizer(2)
+        tokens_map = tokenizer.train(self.train_inputs[vocabulary_id])
+        return (tokens_map, tokenizer._chars_map)
+    
+    def _expected_bytes(self, converters):
+        strings = set()
+        for converter in converters:
+            strings |= set(converter.token_map().values())
+        expected_bytes = sum(converter.estimate_bytes() for converter in converters)
+        return expected_bytes + sum(sys.getsizeof(string) for string in strings)
+    
+    def test_matches_tokenizer(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        
+        for vocabulary_id, train_input in self.train_inputs.items():
+            tokenizer = Tokenizer(2)
+            tokenizer.train(train_input)
+            self.assertEqual(registry.to_tokens(vocabulary_id, train_input), tokenizer.to_tokens(train_input))
+            snapshot = registry.snapshot(vocabulary_id)
+            self.assertEqual(snapshot.from_tokens(snapshot.to_tokens(train_input)), train_input)
+            
+    def test_snapshot_decodes_after_removal_and_eviction(self):
+        registry = TokenizerRegistry(self._loader, 1)
+        converter = registry.get_converter('first')
+        converter.add_token(999, 'abcabc')
+        snapshot = registry.snapshot('first')
+        tokens = snapshot.to_tokens(['abcabc'])
+        
+        converter.remove_token(999)
+        registry.get_converter('second')
+        
+        self.assertEqual(tokens, [[999]])
+        self.assertEqual(snapshot.from_tokens(tokens), ['abcabc'])
+            
+    def test_loads_lazily_and_caches(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        self.assertEqual(self.loaded_ids, [])
+        
+        registry.to_tokens('first', ['ab'])
+        registry.to_tokens('first', ['ba'])
+        
+        self.assertEqual(self.loaded_ids, ['first'])
+        self.assertEqual(registry.stats().loads, 1)
+        self.assertEqual(registry.stats().hits, 1)
+        self.assertEqual(registry.stats().evictions, 0)
+        self.assertGreater(registry.stats().resident_bytes, 0)
+        
+    def test_evicts_least_recently_used(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        registry.get_converter('first')
+        registry.get_converter('second')
+        two_vocabularies_bytes = registry.stats().resident_bytes
+        registry = TokenizerRegistry(self._loader, two_vocabularies_bytes)
+        self.loaded_ids = []
+        
+        registry.get_converter('first')
+        registry.get_converter('second')
+        registry.get_converter('first')
+        registry.get_converter('third')
+        registry.get_converter('first')
+        
+        self.assertEqual(self.loaded_ids, ['first', 'second', 'third'])
+        self.assertEqual(registry.stats().evictions, 1)
+        self.assertLessEqual(registry.stats().resident_bytes, two_vocabularies_bytes)
+        
+    def test_keeps_most_recent_vocabulary_over_limit(self):
+        registry = TokenizerRegistry(self._loader, 0)
+        
+        registry.get_converter('first')
+        registry.get_converter('first')
+        registry.get_converter('second')
+        
+        self.assertEqual(self.loaded_ids, ['first', 'second'])
+        self.assertEqual(registry.stats().evictions, 1)
+        
+    def test_counts_each_token_string_once(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        
+        first = registry.get_converter('first')
+        second = registry.get_converter('second')
+        
+        self.assertEqual(registry.stats().resident_bytes, self._expected_bytes([first, second]))
+        
+    def test_updates_resident_bytes_when_converter_changes(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        converter = registry.get_converter('first')
+        bytes_before = registry.stats().resident_bytes
+        
+        converter.add_token(100, 'abababababababababab')
+        bytes_after_add = registry.stats().resident_bytes
+        converter.remove_token(100)
+        
+        self.assertGreater(bytes_after_add, bytes_before)
+        self.assertEqual(registry.stats().resident_bytes, self._expected_bytes([converter]))
+        
+    def test_evicts_when_converter_grows(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        registry.get_converter('first')
+        registry.get_converter('second')
+        two_vocabularies_bytes = registry.stats().resident_bytes
+        registry = TokenizerRegistry(self._loader, two_vocabularies_bytes)
+        registry.get_converter('first')
+        converter = registry.get_converter('second')
+        
+        converter.add_token(100, 'bdbdbdbdbdbdbdbdbdbdbdbd')
+        
+        self.assertEqual(registry.stats().evictions, 1)
+        self.assertIs(registry.get_converter('second'), converter)
+        
+    def test_updates_survive_eviction(self):
+        registry = TokenizerRegistry(self._loader, 1)
+        converter = registry.get_converter('first')
+        removed_token = max(converter.token_map())
+        
+        converter.add_token(999, 'abcabc')
+        converter.remove_token(removed_token)
+        registry.get_converter('second')
+        reloaded = registry.get_converter('first')
+        
+        self.assertEqual(self.loaded_ids, ['first', 'second', 'first'])
+        self.assertIsNot(reloaded, converter)
+        self.assertEqual(reloaded.to_tokens(['abcabc']), [[999]])
+        self.assertNotIn(removed_token, reloaded.token_map())
+        self.assertEqual(registry.stats().resident_bytes, self._expected_bytes([reloaded]))
+        
+    def test_ignores_updates_of_replaced_converters(self):
+        registry = TokenizerRegistry(self._loader, 1)
+        stale = registry.get_converter('first')
+        registry.get_converter('second')
+        registry.get_converter('first')
+        
+        stale.add_token(999, 'abcabc')
+        registry.get_converter('second')
+        
+        self.assertNotIn(999, registry.get_converter('first').token_map())
+        
+    def test_interns_added_strings(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        first = registry.get_converter('first')
+        second = registry.get_converter('second')
+        string = ''.join(['ab', 'cab'])
+        
+        first.add_token(999, string)
+        second.add_token(999, ''.join(['abc', 'ab']))
+        
+        self.assertIs(first.token_map()[999], second.token_map()[999])
+        self.assertEqual(registry.stats().resident_bytes, self._expected_bytes([first, second]))
+        
+    def test_load_does_not_block_other_vocabularies(self):
+        loading_started = threading.Event()
+        finish_loading = threading.Event()
+        
+        def loader(vocabulary_id):
+            if vocabulary_id == 'second':
+                loading_started.set()
+                finish_loading.wait()
+            return self._loader(vocabulary_id)
+        registry = TokenizerRegistry(loader, 10 ** 9)
+        registry.get_converter('first')
+        threads = [threading.Thread(target=registry.get_converter, args=('second',)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        loading_started.wait()
+        
+        self.assertEqual(registry.to_tokens('first', ['ab']), registry.to_tokens('first', ['ab']))
+        finish_loading.set()
+        for thread in threads:
+            thread.join()
+            
+        self.assertEqual(self.loaded_ids, ['first', 'second'])
+        self.assertEqual(registry.stats().loads, 2)
+        
+    def test_stats_is_a_snapshot(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        stats = registry.stats()
+        
+        registry.get_converter('first')
+        
+        self.assertEqual(stats.loads, 0)
+        self.assertEqual(registry.stats().loads, 1)
+        
+    def test_concurrent_access(self):
+        registry = TokenizerRegistry(self._loader, 0)
+        calls_per_thread = 50
+        
+        def run():
+            for i in range(calls_per_thread):
+                vocabulary_id = list(self.train_inputs)[i % len(self.train_inputs)]
+                registry.to_tokens(vocabulary_id, ['ab'])
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        stats = registry.stats()
+        self.assertEqual(stats.loads + stats.hits, 8 * calls_per_thread)
+        self.assertEqual(stats.evictions, stats.loads - 1)
+        
+    def test_deduplicates_token_strings(self):
+        registry = TokenizerRegistry(self._loader, 10 ** 9)
+        
+        first_map = registry.get_converter('first').token_map()
+        second_map = registry.get_converter('second').token_map()
+        
+        shared = set(first_map.values()) & set(second_map.values())
+        self.assertNotEqual(shared, set())
+        first_strings = {string: string for string in first_map.values()}
+        for string in second_map.values():
+            if string in shared:
+                self.assertIs(first_strings[string], string)
+                
+if __name__ == '__main__':
+    unittest.main()
@@ -67,6 +67,22 @@ class TestTokenizer(unittest.TestCase):
        # All tokens should map to unique strings.
        self.assertEqual(len(tokenizer_map), len(set(tokenizer_map.values())))
        self.assertEqual(test_input_with_unknowns, string_from_tokens)
+       self._test_offsets(tokenizer, test_input, tokens)
+       
+    def _test_offsets(self, tokenizer, test_input, tokens):
+       tokens_with_offsets = tokenizer.to_tokens_with_offsets(test_input)
+       
+       for string, expected_tokens, (string_tokens, starts, ends) in zip(test_input, tokens, tokens_with_offsets):
+           self.assertEqual(expected_tokens, string_tokens)
+           self.assertEqual(starts.itemsize, 4)
+           self.assertEqual(len(starts), len(string_tokens))
+           self.assertEqual(len(ends), len(string_tokens))
+           # Spans are contiguous and cover the whole string.
+           self.assertEqual(list(starts[1:]), list(ends[:-1]))
+           self.assertEqual(starts[0] if starts else 0, 0)
+           self.assertEqual(ends[-1] if ends else 0, len(string))
+           for token, start, end in zip(string_tokens, starts, ends):
+               self.assertEqual(len(tokenizer.from_tokens([[token]])[0]), end - start)
                 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file